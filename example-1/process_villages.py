@@ -1,6 +1,235 @@
 import pandas as pd
 from mm_geo_coder import MMGeoCoder
+from mm_geo_coder.geocoder_utils import clean_address
+import random
+import re
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Retry pass settings
+RETRY_MAX_ATTEMPTS = 4        # attempts per query form before giving up on it
+RETRY_BASE_DELAY = 1.0        # seconds, doubled on every failed attempt
+RETRY_MAX_DELAY = 30.0
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 8
+LATENCY_TOLERANCE = 2.0       # cut concurrency when latency exceeds this multiple of the recent best
+BASELINE_WINDOW = 20          # recent latencies the baseline is taken over
+# MMGeoCoder falls back to nominatim.openstreetmap.org, whose usage policy
+# allows at most 1 request per second, whatever the concurrency
+MAX_REQUESTS_PER_SECOND = 1.0
+
+
+def geocode(query):
+    """
+    Geocode a single query. Returns (latitude, longitude), or None when the
+    service has no result. Service errors are raised to the caller.
+    """
+    geo_coder = MMGeoCoder(query)
+    location = geo_coder.get_geolocation()
+
+    if location and isinstance(location, dict):
+        latitude = location.get('latitude', '')
+        longitude = location.get('longitude', '')
+        if latitude and longitude:
+            return latitude, longitude
+
+    return None
+
+
+def query_variants(village_name):
+    """
+    Alternate query forms for a village name, original first, e.g.
+    'ပါလှဲ့ (အထက်)' -> ['ပါလှဲ့ (အထက်)', 'ပါလှဲ့']
+    Forms that MMGeoCoder would clean into the same query are dropped;
+    clean_address already strips the brackets, so 'ပါလှဲ့ အထက်' is the
+    same request as the original.
+    """
+    name = ' '.join(str(village_name).split())
+    variants = [
+        name,
+        ' '.join(re.sub(r'\([^)]*\)', ' ', name).split()),
+        ' '.join(re.sub(r'[()]', ' ', name).split()),
+    ]
+
+    unique = []
+    seen = set()
+    for variant in variants:
+        key = ' '.join(clean_address(variant).split())
+        if variant and key not in seen:
+            seen.add(key)
+            unique.append(variant)
+    return unique
+
+
+class RequestRateLimiter:
+    """Spaces request starts at least 1/rate seconds apart"""
+
+    def __init__(self, rate=MAX_REQUESTS_PER_SECOND):
+        self.interval = 1.0 / rate
+        self.next_available = 0.0
+
+    def try_acquire(self, now):
+        if now < self.next_available:
+            return False
+        self.next_available = now + self.interval
+        return True
+
+
+class AdaptiveConcurrency:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit.
+    Grows by one after a full window of healthy requests, halves on an
+    error or when smoothed latency rises well above the best of the last
+    BASELINE_WINDOW replies, so one unusually fast reply is soon forgotten.
+    """
+
+    def __init__(self, minimum=MIN_CONCURRENCY, maximum=MAX_CONCURRENCY):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = minimum
+        self._healthy = 0
+        self._recent_latencies = deque(maxlen=BASELINE_WINDOW)
+        self._smoothed_latency = None
+        self._last_cut = 0.0
+
+    def on_success(self, latency, started_at):
+        self._recent_latencies.append(latency)
+        if self._smoothed_latency is None:
+            self._smoothed_latency = latency
+        else:
+            self._smoothed_latency = 0.8 * self._smoothed_latency + 0.2 * latency
+
+        if self._smoothed_latency > min(self._recent_latencies) * LATENCY_TOLERANCE:
+            self._cut(started_at)
+            return
+
+        self._healthy += 1
+        if self._healthy >= self.limit:
+            self.limit = min(self.maximum, self.limit + 1)
+            self._healthy = 0
+
+    def on_error(self, started_at):
+        self._cut(started_at)
+
+    def _cut(self, started_at):
+        # Requests already in flight when we last cut reflect the old
+        # limit; reacting to them again would collapse to the minimum
+        if started_at < self._last_cut:
+            return
+        self.limit = max(self.minimum, self.limit // 2)
+        self._healthy = 0
+        self._last_cut = time.monotonic()
+        # Let the latency signal settle at the new limit
+        self._smoothed_latency = None
+
+
+def _timed_geocode(query):
+    started = time.monotonic()
+    result = geocode(query)
+    return result, time.monotonic() - started
+
+
+def retry_failed(village_names, positions, latitudes, longitudes, errored=(),
+                 max_rate=MAX_REQUESTS_PER_SECOND):
+    """
+    Retry pass over rows that failed or came back empty in the first pass.
+    Tries alternate query forms, backs off on errors and adapts concurrency
+    to how the service is behaving, never starting more than `max_rate`
+    requests per second. Rows in `errored` retry the original query first;
+    rows that came back empty start at the first alternate form. Fills
+    latitudes/longitudes in place and returns the number of rows recovered.
+    """
+    items = deque()
+    for position in positions:
+        item = {
+            'position': position,
+            'variants': query_variants(village_names[position]),
+            'variant': 0 if position in errored else 1,
+            'attempts': 0,
+            'not_before': 0.0,
+        }
+        if item['variant'] < len(item['variants']):
+            items.append(item)
+
+    limiter = AdaptiveConcurrency()
+    rate = RequestRateLimiter(max_rate)
+    in_flight = {}
+    recovered = 0
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
+        while items or in_flight:
+            now = time.monotonic()
+
+            # Launch ready items up to the current limit and request rate;
+            # keep backing-off ones queued
+            deferred = []
+            rate_limited = False
+            while items and len(in_flight) < limiter.limit:
+                item = items.popleft()
+                if item['not_before'] > now:
+                    deferred.append(item)
+                    continue
+                if not rate.try_acquire(now):
+                    deferred.append(item)
+                    rate_limited = True
+                    break
+                query = item['variants'][item['variant']]
+                in_flight[executor.submit(_timed_geocode, query)] = (item, now)
+            items.extendleft(reversed(deferred))
+
+            # With free capacity, wake up when the next request may start:
+            # the first backing-off item or the rate limit, whichever is
+            # sooner. At the limit, wait for a result.
+            timeout = None
+            if items and len(in_flight) < limiter.limit:
+                wake_times = [item['not_before'] for item in items if item['not_before'] > now]
+                if rate_limited:
+                    wake_times.append(rate.next_available)
+                timeout = max(0.0, min(wake_times) - now) if wake_times else 0.0
+
+            if not in_flight:
+                time.sleep(timeout or 0.0)
+                continue
+
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                item, started_at = in_flight.pop(future)
+                position = item['position']
+                query = item['variants'][item['variant']]
+
+                try:
+                    result, latency = future.result()
+                except Exception as e:
+                    limiter.on_error(started_at)
+                    item['attempts'] += 1
+                    if item['attempts'] < RETRY_MAX_ATTEMPTS:
+                        delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (item['attempts'] - 1))
+                        item['not_before'] = time.monotonic() + random.uniform(delay / 2, delay)
+                        print(f"Retry error for {query}: {e} (retrying in ~{delay:.0f}s, concurrency {limiter.limit})")
+                        items.append(item)
+                        continue
+                    print(f"Giving up on query {query} after {RETRY_MAX_ATTEMPTS} attempts")
+                    result = None
+                else:
+                    limiter.on_success(latency, started_at)
+
+                if result:
+                    latitudes[position], longitudes[position] = result
+                    recovered += 1
+                    print(f"Recovered {village_names[position]} using query: {query}")
+                    continue
+
+                # No result for this form: move on to the next alternate query
+                item['variant'] += 1
+                item['attempts'] = 0
+                item['not_before'] = 0.0
+                if item['variant'] < len(item['variants']):
+                    items.append(item)
+
+    return recovered
+
 
 def process_villages():
     """
@@ -14,6 +243,11 @@ def process_villages():
     # Initialize lists to store results
     latitudes = []
     longitudes = []
+    village_names = []
+    
+    # Rows that failed or came back empty, retried after the first pass
+    retry_queue = []
+    errored = set()
     
     # Process each village name
     total_villages = len(df)
@@ -23,29 +257,32 @@ def process_villages():
         print(f"Processing {index + 1}/{total_villages}: {village_name}")
         
         try:
-            # Create MMGeoCoder instance and get location
-            geo_coder = MMGeoCoder(village_name)
-            location = geo_coder.get_geolocation()
-            
-            # Extract latitude and longitude
-            if location and isinstance(location, dict):
-                latitude = location.get('latitude', '')
-                longitude = location.get('longitude', '')
-            else:
-                latitude = ''
-                longitude = ''
-                
+            location = geocode(village_name)
         except Exception as e:
             print(f"Error processing {village_name}: {e}")
+            location = None
+            errored.add(len(latitudes))
+        
+        if location:
+            latitude, longitude = location
+        else:
             latitude = ''
             longitude = ''
+            retry_queue.append(len(latitudes))
         
         latitudes.append(latitude)
         longitudes.append(longitude)
+        village_names.append(village_name)
         
         # Add a small delay to avoid overwhelming the geocoding service
         time.sleep(0.5)
     
+    # Retry failed and empty geocodes with alternate queries and adaptive concurrency
+    if retry_queue:
+        print(f"\nRetrying {len(retry_queue)} villages without coordinates...")
+        recovered = retry_failed(village_names, retry_queue, latitudes, longitudes, errored)
+        print(f"Recovered {recovered}/{len(retry_queue)} villages in retry pass")
+    
     # Add latitude and longitude columns to the dataframe
     df['latitude'] = latitudes
     df['longitude'] = longitudes
@@ -62,4 +299,4 @@ def process_villages():
     print(f"Successfully geocoded: {successful_geocoding}/{total_villages}")
 
 if __name__ == "__main__":
-    process_villages() 
\ No newline at end of file
+    process_villages()
\ No newline at end of file
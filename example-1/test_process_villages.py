@@ -0,0 +1,112 @@
+"""
+Offline tests for the geocode retry pass in process_villages.py
+MMGeoCoder is replaced with a stub, so no network access is needed
+"""
+
+import time
+
+import process_villages
+from process_villages import AdaptiveConcurrency, query_variants, retry_failed
+
+# Fast enough for the tests; the production default is 1 request per second
+TEST_RATE = 1000
+
+
+class StubGeoCoder:
+    """Fails the first call for each query, has no results for bracketed names"""
+
+    calls = {}
+    started = []
+
+    def __init__(self, query):
+        self.query = query
+
+    def get_geolocation(self):
+        StubGeoCoder.started.append(time.monotonic())
+        StubGeoCoder.calls[self.query] = StubGeoCoder.calls.get(self.query, 0) + 1
+        time.sleep(0.01)
+        if StubGeoCoder.calls[self.query] == 1:
+            raise RuntimeError("503 Service Unavailable")
+        if '(' in self.query:
+            return {}
+        return {'latitude': '16.9', 'longitude': '95.8'}
+
+
+def test_query_variants():
+    # 'ပါလှဲ့ အထက်' is dropped: MMGeoCoder cleans it into the same query as the original
+    assert query_variants('ပါလှဲ့ (အထက်)') == ['ပါလှဲ့ (အထက်)', 'ပါလှဲ့']
+    assert query_variants('  အရွဲ  ') == ['အရွဲ']
+
+
+def test_concurrency_grows_on_success_and_halves_on_error():
+    limiter = AdaptiveConcurrency(minimum=1, maximum=8)
+
+    # One more slot after each full window of healthy replies: 1 + 2 + 3
+    for _ in range(6):
+        limiter.on_success(0.1, time.monotonic())
+    assert limiter.limit == 4
+
+    started_before_cut = time.monotonic()
+    limiter.on_error(time.monotonic())
+    assert limiter.limit == 2
+
+    # Requests already in flight at the cut do not cut again
+    limiter.on_error(started_before_cut)
+    assert limiter.limit == 2
+
+
+def test_concurrency_recovers_after_one_fast_reply():
+    limiter = AdaptiveConcurrency(minimum=1, maximum=8)
+
+    limiter.on_success(0.001, time.monotonic())
+    for _ in range(process_villages.BASELINE_WINDOW * 3):
+        limiter.on_success(0.1, time.monotonic())
+
+    assert limiter.limit > 1
+
+
+def use_stub_geocoder(monkeypatch):
+    monkeypatch.setattr(process_villages, 'MMGeoCoder', StubGeoCoder)
+    monkeypatch.setattr(process_villages, 'RETRY_BASE_DELAY', 0.01)
+    StubGeoCoder.calls = {}
+    StubGeoCoder.started = []
+
+
+def test_retry_failed_recovers_with_alternate_queries(monkeypatch):
+    use_stub_geocoder(monkeypatch)
+
+    names = ['ပါလှဲ့ (အထက်)', 'အောက်ဆယ်', 'အရွဲ']
+    latitudes = ['', '', '16.9']
+    longitudes = ['', '', '95.8']
+
+    # Row 0 came back empty, row 1 raised an error in the first pass
+    recovered = retry_failed(names, [0, 1], latitudes, longitudes, errored={1}, max_rate=TEST_RATE)
+
+    assert recovered == 2
+    assert latitudes == ['16.9', '16.9', '16.9']
+    assert longitudes == ['95.8', '95.8', '95.8']
+    # The empty row skips its original query and goes to the stripped form
+    assert 'ပါလှဲ့ (အထက်)' not in StubGeoCoder.calls
+    assert StubGeoCoder.calls['ပါလှဲ့'] == 2
+    # The errored row retries its original query
+    assert StubGeoCoder.calls['အောက်ဆယ်'] == 2
+
+
+def test_empty_row_without_alternates_is_not_retried(monkeypatch):
+    use_stub_geocoder(monkeypatch)
+
+    recovered = retry_failed(['အောက်ဆယ်'], [0], [''], [''], max_rate=TEST_RATE)
+
+    assert recovered == 0
+    assert StubGeoCoder.calls == {}
+
+
+def test_retry_failed_respects_request_rate(monkeypatch):
+    use_stub_geocoder(monkeypatch)
+
+    names = ['အလယ်ချောင်း', 'အောက်ဆယ်', 'အရွဲ', 'ဗျောသလန်း']
+    retry_failed(names, [0, 1, 2, 3], [''] * 4, [''] * 4, errored={0, 1, 2, 3}, max_rate=20)
+
+    gaps = [later - earlier for earlier, later in zip(StubGeoCoder.started, StubGeoCoder.started[1:])]
+    assert len(StubGeoCoder.started) == 8  # every query errors once, then succeeds
+    assert min(gaps) >= 0.05 - 0.005
@@ -0,0 +1,164 @@
+"""
+Admission control for podcast jobs
+Estimates each job's memory and CPU cost from the PDF and only runs jobs
+while they fit a global budget; the rest wait in a FIFO queue
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Rough per-job memory model:
+# - fixed overhead for the prompt, script and synthesized audio
+# - PyPDF2 and pdfplumber each hold a parsed copy of the file
+# - pdfplumber keeps per-page layout objects while extracting
+BASE_JOB_MEMORY = 24 * MB
+FILE_MEMORY_FACTOR = 4
+PAGE_MEMORY = 256 * 1024
+
+# Assumed page density before the PDF is downloaded and its pages counted;
+# small so the provisional estimate errs on the high side for text PDFs
+PROVISIONAL_PAGE_BYTES = 50 * 1024
+
+
+class JobCost(NamedTuple):
+    memory_bytes: int
+    cpu_pages: int
+
+
+def estimate_job_cost(file_size: int, page_count: int) -> JobCost:
+    """Estimate peak memory and CPU work (pages to parse) for one PDF"""
+    memory = BASE_JOB_MEMORY + file_size * FILE_MEMORY_FACTOR + page_count * PAGE_MEMORY
+    return JobCost(memory_bytes=memory, cpu_pages=page_count)
+
+
+def estimate_provisional_cost(file_size: int) -> JobCost:
+    """Estimate a job's cost from its file size alone, before downloading it"""
+    return estimate_job_cost(file_size, max(1, file_size // PROVISIONAL_PAGE_BYTES))
+
+
+class AdmissionController:
+    """
+    Admits jobs against a global memory and CPU budget.
+
+    Jobs are admitted strictly in arrival order so a large PDF cannot be
+    starved by a stream of small ones. Jobs that could never fit, even on
+    an idle bot, are rejected up front by `fits_budget`.
+    """
+
+    def __init__(self, memory_budget: int, cpu_budget: int):
+        self.memory_budget = memory_budget
+        self.cpu_budget = cpu_budget
+        self.memory_in_use = 0
+        self.cpu_in_use = 0
+        self._waiters: Deque[Tuple[JobCost, asyncio.Future]] = deque()
+
+    def fits_budget(self, cost: JobCost) -> bool:
+        """Whether the job fits the budget at all"""
+        return cost.memory_bytes <= self.memory_budget and cost.cpu_pages <= self.cpu_budget
+
+    def clamp(self, cost: JobCost) -> JobCost:
+        """Cap an estimate at the whole budget so it can always be admitted"""
+        return JobCost(
+            memory_bytes=min(cost.memory_bytes, self.memory_budget),
+            cpu_pages=min(cost.cpu_pages, self.cpu_budget),
+        )
+
+    def _has_room(self, cost: JobCost) -> bool:
+        return (
+            self.memory_in_use + cost.memory_bytes <= self.memory_budget
+            and self.cpu_in_use + cost.cpu_pages <= self.cpu_budget
+        )
+
+    def _take(self, cost: JobCost):
+        self.memory_in_use += cost.memory_bytes
+        self.cpu_in_use += cost.cpu_pages
+
+    async def acquire(
+        self,
+        cost: JobCost,
+        on_queued: Optional[Callable[[int], Awaitable[None]]] = None,
+        front: bool = False,
+    ):
+        """
+        Wait until the job is admitted; `on_queued` gets the queue position.
+        `front` puts an already-running job ahead of new arrivals.
+        If this raises, no budget is held.
+        """
+        if (front or not self._waiters) and self._has_room(cost):
+            self._take(cost)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        if front:
+            self._waiters.appendleft((cost, future))
+            position = 1
+        else:
+            self._waiters.append((cost, future))
+            position = len(self._waiters)
+        logger.info(
+            f"Job queued at position {position} "
+            f"({cost.memory_bytes // MB}MB, {cost.cpu_pages} pages)"
+        )
+
+        try:
+            if on_queued:
+                await on_queued(position)
+            await future
+        except BaseException:
+            # Cancelled, or on_queued failed: nobody will release this job
+            if future.done() and not future.cancelled():
+                self.release(cost)
+            else:
+                future.cancel()
+                self._admit_waiters()
+            raise
+
+    async def resize(
+        self,
+        held: JobCost,
+        cost: JobCost,
+        on_queued: Optional[Callable[[int], Awaitable[None]]] = None,
+    ):
+        """
+        Replace a running job's budget `held` with a corrected estimate.
+        Shrinking returns the difference at once. Growing hands the whole
+        budget back without admitting anyone else, then waits at the front
+        of the queue for the new cost, so the job keeps its place and two
+        growing jobs can never deadlock. If this raises, no budget is held.
+        """
+        if cost.memory_bytes <= held.memory_bytes and cost.cpu_pages <= held.cpu_pages:
+            self.release(JobCost(
+                memory_bytes=held.memory_bytes - cost.memory_bytes,
+                cpu_pages=held.cpu_pages - cost.cpu_pages,
+            ))
+            return
+
+        self._give_back(held)
+        await self.acquire(cost, on_queued=on_queued, front=True)
+
+    def release(self, cost: JobCost):
+        """Return a finished job's budget and admit queued jobs that now fit"""
+        self._give_back(cost)
+        self._admit_waiters()
+
+    def _give_back(self, cost: JobCost):
+        self.memory_in_use -= cost.memory_bytes
+        self.cpu_in_use -= cost.cpu_pages
+
+    def _admit_waiters(self):
+        while self._waiters:
+            cost, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if not self._has_room(cost):
+                break
+            self._waiters.popleft()
+            self._take(cost)
+            future.set_result(None)
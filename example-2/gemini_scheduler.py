@@ -0,0 +1,289 @@
+"""
+Rate-limit-aware scheduler for Gemini requests
+Keeps requests within per-minute request/token quotas, shares capacity fairly
+between chats and retries transient errors instead of failing the job
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Set, Tuple
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean "try again later" rather than "this request is broken"
+TRANSIENT_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+)
+
+# Quota errors are specific to a model, so they are worth a fallback model
+QUOTA_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+)
+
+# Rough size of a generated podcast script (~1500 words)
+DEFAULT_OUTPUT_TOKENS = 2000
+
+WINDOW_SECONDS = 60.0
+
+# How long a model is left alone after it returns a quota error
+QUOTA_COOLDOWN_SECONDS = 10.0
+
+
+def estimate_tokens(prompt: str, expected_output_tokens: int = DEFAULT_OUTPUT_TOKENS) -> int:
+    """Estimate the tokens a request will use (~4 characters per token)"""
+    return len(prompt) // 4 + expected_output_tokens
+
+
+def parse_model_names(value: str) -> List[str]:
+    """Parse GEMINI_MODEL, e.g. "gemini-1.5-pro,gemini-1.5-flash" (primary first)"""
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    if not names:
+        raise ValueError("GEMINI_MODEL must name at least one model")
+    return names
+
+
+class RateBudget:
+    """Sliding one-minute window of requests and tokens for a single model"""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._entries: Deque[List[float]] = deque()  # [timestamp, tokens]
+        self._cooldown_until = 0.0
+
+    def _expire(self, now: float):
+        while self._entries and now - self._entries[0][0] >= WINDOW_SECONDS:
+            self._entries.popleft()
+
+    def wait_time(self, tokens: int) -> float:
+        """Seconds until a request of `tokens` fits in both budgets"""
+        now = time.monotonic()
+        self._expire(now)
+
+        wait = max(0.0, self._cooldown_until - now)
+        if not self._entries:
+            # An oversized request still goes through on an empty window
+            return wait
+
+        if len(self._entries) >= self.rpm:
+            oldest = self._entries[len(self._entries) - self.rpm][0]
+            wait = max(wait, oldest + WINDOW_SECONDS - now)
+
+        used = sum(entry[1] for entry in self._entries)
+        if used + tokens > self.tpm:
+            # Find how many of the oldest entries must expire to make room
+            excess = used + tokens - self.tpm
+            for timestamp, entry_tokens in self._entries:
+                excess -= entry_tokens
+                if excess <= 0:
+                    wait = max(wait, timestamp + WINDOW_SECONDS - now)
+                    break
+            else:
+                # Larger than the whole budget: wait for an empty window
+                wait = max(wait, self._entries[-1][0] + WINDOW_SECONDS - now)
+
+        return wait
+
+    def cooldown(self, seconds: float):
+        """Hold off all requests after the API reports the quota exhausted"""
+        self._cooldown_until = max(self._cooldown_until, time.monotonic() + seconds)
+
+    def reserve(self, tokens: int) -> List[float]:
+        """Record a request; returns the entry so usage can be corrected later"""
+        entry = [time.monotonic(), float(tokens)]
+        self._entries.append(entry)
+        return entry
+
+    @staticmethod
+    def reconcile(entry: List[float], actual_tokens: int):
+        """Replace the estimate with the token count reported by the API"""
+        entry[1] = float(actual_tokens)
+
+
+class _PendingRequest:
+    def __init__(self, prompt: str, chat_id: int, tokens: int, future: asyncio.Future):
+        self.prompt = prompt
+        self.chat_id = chat_id
+        self.tokens = tokens
+        self.future = future
+        self.attempt = 0
+        self.model_index = 0
+
+
+class GeminiScheduler:
+    """
+    Shared front for all Gemini calls.
+
+    Requests are queued per chat and dispatched round-robin, so one chat
+    uploading many PDFs cannot starve the others. A request is only sent
+    once it fits the RPM/TPM budget of its model; transient errors are
+    retried with jittered exponential backoff, and quota errors move the
+    request to the next fallback model if one is configured.
+    """
+
+    def __init__(
+        self,
+        model_names: List[str],
+        rpm: int = 15,
+        tpm: int = 1_000_000,
+        max_retries: int = 5,
+        base_delay: float = 2.0,
+        max_delay: float = 60.0,
+    ):
+        self.model_names = model_names
+        self.models = [genai.GenerativeModel(name) for name in model_names]
+        self.budgets = [RateBudget(rpm, tpm) for _ in model_names]
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._queues: "OrderedDict[int, Deque[_PendingRequest]]" = OrderedDict()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        # asyncio only keeps weak references to tasks; hold in-flight calls here
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def generate(self, prompt: str, chat_id: int) -> str:
+        """Queue a prompt and wait for the generated text"""
+        self._ensure_dispatcher()
+        future = asyncio.get_running_loop().create_future()
+        request = _PendingRequest(prompt, chat_id, estimate_tokens(prompt), future)
+        self._enqueue(request)
+
+        queued = sum(len(queue) for queue in self._queues.values())
+        if queued > 1:
+            logger.info(f"Gemini request for chat {chat_id} queued ({queued} waiting)")
+
+        return await future
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    def _enqueue(self, request: _PendingRequest, front: bool = False):
+        queue = self._queues.setdefault(request.chat_id, deque())
+        if front:
+            queue.appendleft(request)
+        else:
+            queue.append(request)
+        self._wakeup.set()
+
+    def _next_ready_request(self) -> Tuple[Optional[_PendingRequest], Optional[float]]:
+        """
+        Pop the first request, round-robin over chats, whose model budget has
+        room now. Otherwise return how long until one might (None if idle).
+        """
+        soonest = None
+        for chat_id, queue in list(self._queues.items()):
+            # Drop requests whose caller has gone away (e.g. cancelled
+            # handler) so they do not spend quota on an unread result
+            while queue and queue[0].future.done():
+                queue.popleft()
+            if not queue:
+                del self._queues[chat_id]
+                continue
+
+            request = queue[0]
+            wait = self.budgets[request.model_index].wait_time(request.tokens)
+            if wait <= 0:
+                queue.popleft()
+                if queue:
+                    self._queues.move_to_end(chat_id)
+                else:
+                    del self._queues[chat_id]
+                return request, None
+            soonest = wait if soonest is None else min(soonest, wait)
+        return None, soonest
+
+    async def _dispatch_loop(self):
+        while True:
+            request, wait = self._next_ready_request()
+            if request is None:
+                # Sleep until a budget frees up or new work is queued
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            entry = self.budgets[request.model_index].reserve(request.tokens)
+            task = asyncio.create_task(self._execute(request, entry))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _execute(self, request: _PendingRequest, entry: List[float]):
+        model = self.models[request.model_index]
+        model_name = self.model_names[request.model_index]
+        loop = asyncio.get_running_loop()
+
+        try:
+            response = await loop.run_in_executor(None, model.generate_content, request.prompt)
+        except TRANSIENT_ERRORS as e:
+            self._retry_or_fail(request, e)
+            return
+        except Exception as e:
+            logger.error(f"Gemini request for chat {request.chat_id} failed on {model_name}: {e}")
+            if not request.future.done():
+                request.future.set_exception(e)
+            return
+
+        usage = getattr(response, 'usage_metadata', None)
+        total_tokens = getattr(usage, 'total_token_count', None)
+        if total_tokens:
+            RateBudget.reconcile(entry, total_tokens)
+
+        if not request.future.done():
+            try:
+                request.future.set_result(response.text)
+            except Exception as e:
+                # response.text raises when the candidate was blocked
+                request.future.set_exception(e)
+
+    def _retry_or_fail(self, request: _PendingRequest, error: Exception):
+        model_name = self.model_names[request.model_index]
+        request.attempt += 1
+
+        if request.attempt > self.max_retries:
+            logger.error(
+                f"Gemini request for chat {request.chat_id} failed after "
+                f"{self.max_retries} retries: {error}"
+            )
+            if not request.future.done():
+                request.future.set_exception(error)
+            return
+
+        if isinstance(error, QUOTA_ERRORS):
+            self.budgets[request.model_index].cooldown(QUOTA_COOLDOWN_SECONDS)
+
+        if isinstance(error, QUOTA_ERRORS) and request.model_index + 1 < len(self.models):
+            request.model_index += 1
+            logger.warning(
+                f"Quota exceeded on {model_name}, falling back to "
+                f"{self.model_names[request.model_index]}"
+            )
+            self._enqueue(request, front=True)
+            return
+
+        delay = self._backoff_delay(request.attempt)
+        logger.warning(
+            f"Transient Gemini error on {model_name} (attempt {request.attempt}/"
+            f"{self.max_retries}), retrying in {delay:.1f}s: {error}"
+        )
+        asyncio.get_running_loop().call_later(delay, self._enqueue, request, True)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
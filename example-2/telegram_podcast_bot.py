@@ -18,9 +18,9 @@ import pdfplumber
 import google.generativeai as genai
 from dotenv import load_dotenv
 
-# Audio Generation
-from gtts import gTTS
-import io
+from admission import MB, AdmissionController, estimate_job_cost, estimate_provisional_cost
+from gemini_scheduler import GeminiScheduler, parse_model_names
+from tts_backends import TTSRouter, parse_language_backends
 
 # Load environment variables
 load_dotenv()
@@ -40,13 +40,34 @@ logger = logging.getLogger(__name__)
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-pro')
+GEMINI_RPM = int(os.getenv('GEMINI_RPM', '15'))
+GEMINI_TPM = int(os.getenv('GEMINI_TPM', '1000000'))
+GEMINI_MAX_RETRIES = int(os.getenv('GEMINI_MAX_RETRIES', '5'))
+DEFAULT_LANGUAGE = os.getenv('DEFAULT_LANGUAGE', 'en')
+TTS_BACKEND = os.getenv('TTS_BACKEND', 'gtts')
+TTS_LANGUAGE_BACKENDS = os.getenv('TTS_LANGUAGE_BACKENDS', '')
+MAX_FILE_SIZE_MB = int(os.getenv('MAX_FILE_SIZE_MB', '20'))
+MAX_JOB_MEMORY_MB = int(os.getenv('MAX_JOB_MEMORY_MB', '512'))
+MAX_ACTIVE_PAGES = int(os.getenv('MAX_ACTIVE_PAGES', '1000'))
+
+# Telegram plays these inline with send_audio; other formats go as documents
+TELEGRAM_AUDIO_EXTENSIONS = ('.mp3', '.m4a')
+# Largest file a bot may upload through the Bot API
+TELEGRAM_UPLOAD_LIMIT_MB = 50
 
 # Configure Gemini
 genai.configure(api_key=GEMINI_API_KEY)
 
 class PodcastBot:
     def __init__(self):
-        self.model = genai.GenerativeModel(GEMINI_MODEL)
+        self.scheduler = GeminiScheduler(
+            parse_model_names(GEMINI_MODEL),
+            rpm=GEMINI_RPM,
+            tpm=GEMINI_TPM,
+            max_retries=GEMINI_MAX_RETRIES,
+        )
+        self.tts = TTSRouter(TTS_BACKEND, parse_language_backends(TTS_LANGUAGE_BACKENDS))
+        self.admission = AdmissionController(MAX_JOB_MEMORY_MB * MB, MAX_ACTIVE_PAGES)
         self.temp_dir = Path("temp_audio")
         self.temp_dir.mkdir(exist_ok=True)
         
@@ -97,21 +118,40 @@ Just upload a PDF and watch the magic happen! 🚀
 
 4. **Audio Synthesis** 🎵
    - Converts the script to natural-sounding speech
-   - Uses gTTS for high-quality audio generation
+   - Uses gTTS or a local offline engine for audio generation
 
 5. **Delivery** 📤
    - Sends the audio file back to the chat
    - Provides progress updates throughout the process
 
-**Supported Languages:** English (default)
-**Max PDF Size:** 20MB
+**Language:** `{default_lang}` by default, change it with `/language <code>` (e.g. `/language my`)
+**Max PDF Size:** {max_size}MB
 **Processing Time:** 2-5 minutes depending on PDF size
 
 Try uploading a PDF now! 🎙️
-        """
+        """.format(max_size=MAX_FILE_SIZE_MB, default_lang=DEFAULT_LANGUAGE)
         await update.message.reply_text(help_text, parse_mode='Markdown')
     
+    async def language_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /language command: set the podcast language for this chat"""
+        if not context.args:
+            current = context.chat_data.get('language', DEFAULT_LANGUAGE)
+            await update.message.reply_text(
+                f"🌐 Podcast language: `{current}`\n\nUse `/language <code>` to change it, e.g. `/language my`.",
+                parse_mode='Markdown'
+            )
+            return
+        
+        lang = context.args[0].strip().lower().replace('_', '-')
+        context.chat_data['language'] = lang
+        await update.message.reply_text(f"✅ Podcasts in this chat will now be generated in `{lang}`.", parse_mode='Markdown')
+    
     async def extract_text_from_pdf(self, pdf_path: Path) -> str:
+        """Extract text from PDF in a worker thread so other chats keep running"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._extract_text, pdf_path)
+    
+    def _extract_text(self, pdf_path: Path) -> str:
         """Extract text from PDF using multiple methods"""
         text = ""
         
@@ -140,7 +180,16 @@ Try uploading a PDF now! 🎙️
         
         return text.strip()
     
-    async def generate_podcast_script(self, text: str) -> str:
+    async def count_pdf_pages(self, pdf_path: Path) -> int:
+        """Count pages without extracting any text"""
+        def count():
+            with open(pdf_path, 'rb') as file:
+                return len(PyPDF2.PdfReader(file).pages)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, count)
+    
+    async def generate_podcast_script(self, text: str, chat_id: int, lang: str = DEFAULT_LANGUAGE) -> str:
         """Generate a podcast script from the extracted text using Gemini"""
         prompt = f"""
 You are a professional podcast script writer. Convert the following text into an engaging podcast script.
@@ -153,6 +202,7 @@ You are a professional podcast script writer. Convert the following text into an
 - Use a friendly, informative tone
 - Structure it with clear sections
 - Add brief pauses and emphasis markers where appropriate
+- Write the script in the language with code "{lang}"
 
 **Text to convert:**
 {text[:8000]}  # Limit text length for API
@@ -166,8 +216,7 @@ Make it sound natural when spoken aloud.
         """
         
         try:
-            response = self.model.generate_content(prompt)
-            script = response.text
+            script = await self.scheduler.generate(prompt, chat_id)
             
             if not script:
                 raise ValueError("Failed to generate script")
@@ -178,21 +227,45 @@ Make it sound natural when spoken aloud.
             logger.error(f"Error generating script with Gemini: {e}")
             raise
     
-    async def text_to_speech(self, script: str, output_path: Path) -> Path:
-        """Convert text to speech using gTTS"""
+    async def text_to_speech(self, script: str, output_path: Path, lang: str = DEFAULT_LANGUAGE) -> Path:
+        """Convert text to speech using the backend configured for the language"""
         try:
-            # Create gTTS object
-            tts = gTTS(text=script, lang='en', slow=False)
-            
-            # Save to file
-            tts.save(str(output_path))
+            backend = self.tts.backend_for(lang)
+            output_path = output_path.with_suffix(backend.file_extension)
             
-            return output_path
+            return await backend.synthesize_async(script, lang, output_path)
             
         except Exception as e:
             logger.error(f"Error converting text to speech: {e}")
             raise
     
+    async def send_podcast_audio(self, context: ContextTypes.DEFAULT_TYPE, chat_id: int, audio_path: Path, title: str):
+        """Send the podcast, as playable audio when Telegram supports the format"""
+        if audio_path.stat().st_size > TELEGRAM_UPLOAD_LIMIT_MB * MB:
+            raise ValueError(
+                f"The generated audio is larger than Telegram's {TELEGRAM_UPLOAD_LIMIT_MB}MB upload limit. "
+                "Please try a shorter document."
+            )
+        
+        caption = "🎙️ Your podcast is ready! Generated from the uploaded PDF."
+        
+        with open(audio_path, 'rb') as audio_file:
+            if audio_path.suffix.lower() in TELEGRAM_AUDIO_EXTENSIONS:
+                await context.bot.send_audio(
+                    chat_id=chat_id,
+                    audio=audio_file,
+                    title=title,
+                    performer="AI Podcast Bot",
+                    caption=caption
+                )
+            else:
+                await context.bot.send_document(
+                    chat_id=chat_id,
+                    document=audio_file,
+                    filename=f"{title}{audio_path.suffix}",
+                    caption=caption
+                )
+    
     async def send_progress_update(self, context: ContextTypes.DEFAULT_TYPE, chat_id: int, message: str):
         """Send progress update to the chat"""
         try:
@@ -213,9 +286,9 @@ Make it sound natural when spoken aloud.
         if not message.document or not message.document.file_name.lower().endswith('.pdf'):
             return
         
-        # Check file size (limit to 20MB)
-        if message.document.file_size > 20 * 1024 * 1024:
-            await message.reply_text("❌ File too large! Please upload a PDF smaller than 20MB.")
+        # Check file size
+        if message.document.file_size > MAX_FILE_SIZE_MB * MB:
+            await message.reply_text(f"❌ File too large! Please upload a PDF smaller than {MAX_FILE_SIZE_MB}MB.")
             return
         
         # Send initial confirmation
@@ -224,15 +297,43 @@ Make it sound natural when spoken aloud.
             parse_mode='Markdown'
         )
         
+        async def notify_queued(position: int):
+            await self.send_progress_update(
+                context, chat_id, f"⏳ The bot is busy. Your PDF is number {position} in the queue..."
+            )
+        
+        # Reserve budget before downloading, sized from the file alone;
+        # corrected once the page count is known
+        held = self.admission.clamp(estimate_provisional_cost(message.document.file_size))
+        await self.admission.acquire(held, on_queued=notify_queued)
+        
+        temp_pdf = None
+        output_path = None
+        
         try:
             # Step 1: Download the PDF
             await self.send_progress_update(context, chat_id, "📥 Downloading PDF...")
             file = await context.bot.get_file(message.document.file_id)
             
             # Create temporary file
-            temp_pdf = self.temp_dir / f"input_{chat_id}_{message.document.file_name}"
+            # The message id keeps concurrent uploads of the same file apart
+            temp_pdf = self.temp_dir / f"input_{chat_id}_{message.message_id}_{message.document.file_name}"
             await file.download_to_drive(temp_pdf)
             
+            # Correct the job's budget now that the page count is known
+            page_count = await self.count_pdf_pages(temp_pdf)
+            cost = estimate_job_cost(message.document.file_size, page_count)
+            
+            if not self.admission.fits_budget(cost):
+                await message.reply_text(
+                    f"❌ This PDF ({page_count} pages) is too large to process. Please upload a smaller document."
+                )
+                return
+            
+            provisional, held = held, None
+            await self.admission.resize(provisional, cost, on_queued=notify_queued)
+            held = cost
+            
             # Step 2: Extract text
             await self.send_progress_update(context, chat_id, "🔍 Extracting text from PDF...")
             extracted_text = await self.extract_text_from_pdf(temp_pdf)
@@ -243,26 +344,22 @@ Make it sound natural when spoken aloud.
             
             # Step 3: Generate podcast script
             await self.send_progress_update(context, chat_id, "✍️ Generating podcast script with AI...")
-            script = await self.generate_podcast_script(extracted_text)
+            lang = context.chat_data.get('language', DEFAULT_LANGUAGE)
+            script = await self.generate_podcast_script(extracted_text, chat_id, lang)
             
             # Step 4: Convert to speech
             await self.send_progress_update(context, chat_id, "🎵 Converting script to audio...")
-            output_filename = f"podcast_{chat_id}_{message.document.file_name.replace('.pdf', '.mp3')}"
+            output_filename = f"podcast_{chat_id}_{message.message_id}_{message.document.file_name.replace('.pdf', '.mp3')}"
             output_path = self.temp_dir / output_filename
             
-            await self.text_to_speech(script, output_path)
+            output_path = await self.text_to_speech(script, output_path, lang)
             
             # Step 5: Send the audio file
             await self.send_progress_update(context, chat_id, "📤 Uploading audio file...")
             
-            with open(output_path, 'rb') as audio_file:
-                await context.bot.send_audio(
-                    chat_id=chat_id,
-                    audio=audio_file,
-                    title=f"Podcast: {message.document.file_name.replace('.pdf', '')}",
-                    performer="AI Podcast Bot",
-                    caption="🎙️ Your podcast is ready! Generated from the uploaded PDF."
-                )
+            await self.send_podcast_audio(
+                context, chat_id, output_path, f"Podcast: {message.document.file_name.replace('.pdf', '')}"
+            )
             
             # Send completion message
             await context.bot.send_message(
@@ -271,10 +368,6 @@ Make it sound natural when spoken aloud.
                 parse_mode='Markdown'
             )
             
-            # Clean up temporary files
-            temp_pdf.unlink(missing_ok=True)
-            output_path.unlink(missing_ok=True)
-            
             logger.info(f"Successfully processed PDF for chat {chat_id}")
             
         except Exception as e:
@@ -283,10 +376,16 @@ Make it sound natural when spoken aloud.
                 f"❌ **Error processing PDF:**\n\n{str(e)}\n\nPlease try again with a different file.",
                 parse_mode='Markdown'
             )
+        
+        finally:
+            if held is not None:
+                self.admission.release(held)
             
-            # Clean up on error
-            temp_pdf.unlink(missing_ok=True)
-            output_path.unlink(missing_ok=True)
+            # Clean up temporary files
+            if temp_pdf:
+                temp_pdf.unlink(missing_ok=True)
+            if output_path:
+                output_path.unlink(missing_ok=True)
     
     async def error_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle errors"""
@@ -311,11 +410,14 @@ def main():
     bot = PodcastBot()
     
     # Create application
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    # Concurrent updates let several PDFs be processed at once; the
+    # admission controller keeps their combined cost within budget
+    application = Application.builder().token(TELEGRAM_BOT_TOKEN).concurrent_updates(True).build()
     
     # Add handlers
     application.add_handler(CommandHandler("start", bot.start_command))
     application.add_handler(CommandHandler("help", bot.help_command))
+    application.add_handler(CommandHandler("language", bot.language_command))
     application.add_handler(MessageHandler(filters.Document.ALL, bot.handle_pdf_upload))
     
     # Add error handler
@@ -0,0 +1,145 @@
+"""
+Offline tests for job admission control
+"""
+
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, JobCost
+
+SMALL = JobCost(memory_bytes=40, cpu_pages=10)
+LARGE = JobCost(memory_bytes=80, cpu_pages=10)
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_jobs_are_admitted_in_arrival_order():
+    async def run():
+        controller = AdmissionController(memory_budget=100, cpu_budget=100)
+        await controller.acquire(SMALL)
+
+        admitted = []
+
+        async def job(name, cost):
+            await controller.acquire(cost)
+            admitted.append(name)
+
+        large = asyncio.create_task(job('large', LARGE))
+        await settle()
+        # Fits on its own, but must not overtake the queued large job
+        small = asyncio.create_task(job('small', SMALL))
+        await settle()
+        assert admitted == []
+
+        controller.release(SMALL)
+        await large
+        await settle()
+        order_after_first_release = list(admitted)
+
+        controller.release(LARGE)
+        await small
+        return order_after_first_release, admitted
+
+    after_first_release, admitted = asyncio.run(run())
+    assert after_first_release == ['large']
+    assert admitted == ['large', 'small']
+
+
+def test_release_admits_waiters_that_fit():
+    async def run():
+        controller = AdmissionController(memory_budget=100, cpu_budget=100)
+        await controller.acquire(LARGE)
+
+        positions = []
+
+        async def on_queued(position):
+            positions.append(position)
+
+        first = asyncio.create_task(controller.acquire(SMALL, on_queued=on_queued))
+        second = asyncio.create_task(controller.acquire(SMALL, on_queued=on_queued))
+        await settle()
+        assert not first.done() and not second.done()
+
+        controller.release(LARGE)
+        await asyncio.gather(first, second)
+        return positions, controller
+
+    positions, controller = asyncio.run(run())
+    assert positions == [1, 2]
+    assert controller.memory_in_use == 80
+    assert controller.cpu_in_use == 20
+
+
+def test_cancelled_waiter_holds_no_budget():
+    async def run():
+        controller = AdmissionController(memory_budget=100, cpu_budget=100)
+        await controller.acquire(LARGE)
+
+        waiter = asyncio.create_task(controller.acquire(LARGE))
+        await settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        controller.release(LARGE)
+        return controller
+
+    controller = asyncio.run(run())
+    assert controller.memory_in_use == 0
+    assert controller.cpu_in_use == 0
+
+
+def test_failing_on_queued_holds_no_budget():
+    async def run():
+        controller = AdmissionController(memory_budget=100, cpu_budget=100)
+        await controller.acquire(LARGE)
+
+        async def on_queued(position):
+            raise RuntimeError("Telegram unavailable")
+
+        with pytest.raises(RuntimeError):
+            await controller.acquire(SMALL, on_queued=on_queued)
+
+        controller.release(LARGE)
+        await settle()
+        return controller
+
+    controller = asyncio.run(run())
+    assert controller.memory_in_use == 0
+
+
+def test_resize_shrinks_and_grows():
+    async def run():
+        controller = AdmissionController(memory_budget=100, cpu_budget=100)
+        await controller.acquire(LARGE)
+        await controller.resize(LARGE, SMALL)
+        shrunk = controller.memory_in_use
+
+        await controller.resize(SMALL, LARGE)
+        return shrunk, controller.memory_in_use
+
+    assert asyncio.run(run()) == (40, 80)
+
+
+def test_growing_job_keeps_its_place_ahead_of_waiters():
+    async def run():
+        controller = AdmissionController(memory_budget=100, cpu_budget=100)
+        await controller.acquire(SMALL)
+
+        waiter = asyncio.create_task(controller.acquire(LARGE))
+        await settle()
+
+        grown = JobCost(memory_bytes=60, cpu_pages=10)
+        await asyncio.wait_for(controller.resize(SMALL, grown), timeout=1)
+        await settle()
+        waiter_admitted = waiter.done()
+
+        controller.release(grown)
+        await waiter
+        return waiter_admitted, controller.memory_in_use
+
+    assert asyncio.run(run()) == (False, 80)
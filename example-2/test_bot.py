@@ -125,6 +125,39 @@ def test_tts():
         print(f"❌ Text-to-speech error: {e}")
         return False
 
+def test_offline_tts():
+    """Test the local offline text-to-speech backend"""
+    print("\n🔈 Testing Offline Text-to-Speech...")
+    
+    try:
+        import pyttsx3  # noqa: F401
+    except ImportError:
+        print("⚠️  pyttsx3 not installed. Skipping offline TTS test.")
+        return True
+    
+    try:
+        from tts_backends import Pyttsx3Backend
+        
+        backend = Pyttsx3Backend()
+        
+        temp_dir = Path("temp_audio")
+        temp_dir.mkdir(exist_ok=True)
+        
+        test_audio_path = temp_dir / f"test_offline_audio{backend.file_extension}"
+        backend.synthesize("This is a test of the offline text to speech engine.", "en", test_audio_path)
+        
+        if test_audio_path.exists() and test_audio_path.stat().st_size > 0:
+            print("✅ Offline text-to-speech is working correctly")
+            test_audio_path.unlink()
+            return True
+        else:
+            print("❌ Offline text-to-speech failed to generate audio file")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Offline text-to-speech error: {e}")
+        return False
+
 def test_script_generation():
     """Test AI script generation"""
     print("\n✍️ Testing Script Generation...")
@@ -165,6 +198,7 @@ def main():
         test_gemini_api,
         test_pdf_processing,
         test_tts,
+        test_offline_tts,
         test_script_generation
     ]
     
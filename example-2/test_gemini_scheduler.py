@@ -0,0 +1,161 @@
+"""
+Offline tests for the Gemini request scheduler
+The Gemini models are replaced with stubs, so no API key or network is needed
+"""
+
+import asyncio
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+import gemini_scheduler
+from gemini_scheduler import GeminiScheduler, RateBudget, _PendingRequest
+
+
+class StubResponse:
+    usage_metadata = None
+
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Raises the queued errors in order, then answers with its name"""
+
+    def __init__(self, name, errors=()):
+        self.name = name
+        self.errors = list(errors)
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return StubResponse(f"{self.name}: {prompt}")
+
+
+def make_scheduler(*models, **kwargs):
+    scheduler = GeminiScheduler([model.name for model in models], base_delay=0.01, **kwargs)
+    scheduler.models = list(models)
+    return scheduler
+
+
+def test_rate_budget_limits_requests_per_minute():
+    budget = RateBudget(rpm=2, tpm=1_000_000)
+    budget.reserve(10)
+    assert budget.wait_time(10) == 0
+    budget.reserve(10)
+    assert budget.wait_time(10) == pytest.approx(60, abs=1)
+
+
+def test_rate_budget_limits_tokens_per_minute():
+    budget = RateBudget(rpm=100, tpm=1000)
+    assert budget.wait_time(5000) == 0  # oversized, but the window is empty
+
+    budget.reserve(900)
+    assert budget.wait_time(100) == 0
+    assert budget.wait_time(200) == pytest.approx(60, abs=1)
+    assert budget.wait_time(5000) == pytest.approx(60, abs=1)
+
+
+def test_rate_budget_cooldown():
+    budget = RateBudget(rpm=100, tpm=1000)
+    budget.cooldown(5)
+    assert budget.wait_time(10) == pytest.approx(5, abs=0.5)
+
+
+def test_round_robin_between_chats():
+    async def run():
+        scheduler = make_scheduler(StubModel('primary'))
+        scheduler._wakeup = asyncio.Event()
+        future = asyncio.get_running_loop().create_future()
+        for chat_id, prompt in [(1, 'a1'), (1, 'a2'), (1, 'a3'), (2, 'b1')]:
+            scheduler._enqueue(_PendingRequest(prompt, chat_id, 10, future))
+
+        order = []
+        while True:
+            request, _ = scheduler._next_ready_request()
+            if request is None:
+                return order
+            order.append(request.prompt)
+
+    assert asyncio.run(run()) == ['a1', 'b1', 'a2', 'a3']
+
+
+def test_ready_fallback_request_is_not_blocked_by_primary():
+    async def run():
+        scheduler = make_scheduler(StubModel('primary'), StubModel('fallback'), rpm=1)
+        scheduler._wakeup = asyncio.Event()
+        scheduler.budgets[0].reserve(10)
+        future = asyncio.get_running_loop().create_future()
+
+        waiting = _PendingRequest('primary', 1, 10, future)
+        fallback = _PendingRequest('fallback', 2, 10, future)
+        fallback.model_index = 1
+        scheduler._enqueue(waiting)
+        scheduler._enqueue(fallback)
+
+        request, _ = scheduler._next_ready_request()
+        return request
+
+    assert asyncio.run(run()).prompt == 'fallback'
+
+
+def test_transient_error_is_retried():
+    model = StubModel('primary', [google_exceptions.ServiceUnavailable('down')])
+
+    async def run():
+        scheduler = make_scheduler(model)
+        return await scheduler.generate('hello', chat_id=1)
+
+    assert asyncio.run(run()) == 'primary: hello'
+    assert model.calls == 2
+
+
+def test_quota_error_moves_to_fallback_and_cools_down(monkeypatch):
+    monkeypatch.setattr(gemini_scheduler, 'QUOTA_COOLDOWN_SECONDS', 30)
+    primary = StubModel('primary', [google_exceptions.ResourceExhausted('quota')])
+    fallback = StubModel('fallback')
+
+    async def run():
+        scheduler = make_scheduler(primary, fallback)
+        text = await scheduler.generate('hello', chat_id=1)
+        return scheduler, text
+
+    scheduler, text = asyncio.run(run())
+    assert text == 'fallback: hello'
+    assert scheduler.budgets[0].wait_time(10) > 20
+    assert scheduler.budgets[1].wait_time(10) == 0
+
+
+def test_non_transient_error_fails_without_retry():
+    model = StubModel('primary', [ValueError('bad prompt')])
+
+    async def run():
+        scheduler = make_scheduler(model)
+        return await scheduler.generate('hello', chat_id=1)
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+    assert model.calls == 1
+
+
+def test_cancelled_request_is_not_dispatched():
+    model = StubModel('primary')
+
+    async def run():
+        scheduler = make_scheduler(model, rpm=1)
+        scheduler.budgets[0].reserve(10)  # hold the request in the queue
+
+        waiting = asyncio.create_task(scheduler.generate('hello', chat_id=1))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        await asyncio.sleep(0.01)
+
+        request, wait = scheduler._next_ready_request()
+        return request, wait, scheduler
+
+    request, wait, scheduler = asyncio.run(run())
+    assert request is None and wait is None
+    assert not scheduler._queues
+    assert model.calls == 0
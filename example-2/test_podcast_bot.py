@@ -0,0 +1,58 @@
+"""
+Offline tests for delivering the generated podcast to Telegram
+The Telegram bot is replaced with a stub that records what was sent
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from telegram_podcast_bot import PodcastBot
+
+
+class StubTelegramBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_audio(self, chat_id, audio, **kwargs):
+        self.sent.append(('audio', audio.read(), kwargs))
+
+    async def send_document(self, chat_id, document, **kwargs):
+        self.sent.append(('document', document.read(), kwargs))
+
+
+def send(audio_path):
+    bot = PodcastBot.__new__(PodcastBot)  # the send path needs no Gemini/TTS setup
+    context = SimpleNamespace(bot=StubTelegramBot())
+    asyncio.run(bot.send_podcast_audio(context, 1, audio_path, "Podcast: test"))
+    return context.bot.sent
+
+
+def test_mp3_is_sent_as_audio(tmp_path):
+    audio_path = tmp_path / "podcast.mp3"
+    audio_path.write_bytes(b"mp3 data")
+
+    [(method, data, kwargs)] = send(audio_path)
+    assert method == 'audio'
+    assert data == b"mp3 data"
+    assert kwargs['title'] == "Podcast: test"
+
+
+def test_wav_is_sent_as_document(tmp_path):
+    audio_path = tmp_path / "podcast.wav"
+    audio_path.write_bytes(b"wav data")
+
+    [(method, data, kwargs)] = send(audio_path)
+    assert method == 'document'
+    assert data == b"wav data"
+    assert kwargs['filename'] == "Podcast: test.wav"
+
+
+def test_audio_over_upload_limit_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr('telegram_podcast_bot.TELEGRAM_UPLOAD_LIMIT_MB', 0)
+    audio_path = tmp_path / "podcast.wav"
+    audio_path.write_bytes(b"wav data")
+
+    with pytest.raises(ValueError):
+        send(audio_path)
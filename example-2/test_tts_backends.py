@@ -0,0 +1,64 @@
+"""
+Offline tests for TTS backend selection in tts_backends.py
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from tts_backends import GTTSBackend, Pyttsx3Backend, TTSBackend, TTSRouter, parse_language_backends
+
+
+class StubEngine:
+    """Voices listed the way the eSpeak driver reports them"""
+
+    voices = [
+        SimpleNamespace(id='bn', name='Bengali', languages=[b'\x05bn']),
+        SimpleNamespace(id='fr-fr', name='French', languages=[b'\x05fr-fr']),
+        SimpleNamespace(id='hy', name='Armenian', languages=[b'\x05hy']),
+        SimpleNamespace(id='en-gb', name='English', languages=[b'\x05en-gb']),
+        SimpleNamespace(id='en-us', name='English_(America)', languages=[b'\x05en-us']),
+    ]
+
+    def getProperty(self, name):
+        return self.voices
+
+
+def test_find_voice_matches_language_codes_not_names():
+    assert Pyttsx3Backend._find_voice(StubEngine(), 'en') == 'en-gb'
+    assert Pyttsx3Backend._find_voice(StubEngine(), 'en_US') == 'en-us'
+    assert Pyttsx3Backend._find_voice(StubEngine(), 'fr') == 'fr-fr'
+
+
+def test_find_voice_without_match():
+    assert Pyttsx3Backend._find_voice(StubEngine(), 'my') is None
+
+
+def test_backend_must_implement_synthesize():
+    class Incomplete(TTSBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_parse_language_backends():
+    assert parse_language_backends("en:pyttsx3, my_MM:gtts,") == {'en': 'pyttsx3', 'my-mm': 'gtts'}
+    assert parse_language_backends("") == {}
+    with pytest.raises(ValueError):
+        parse_language_backends("en")
+
+
+def test_router_picks_backend_per_language():
+    router = TTSRouter("gtts", parse_language_backends("en:pyttsx3"))
+
+    assert isinstance(router.backend_for("en"), Pyttsx3Backend)
+    assert isinstance(router.backend_for("en-GB"), Pyttsx3Backend)
+    assert isinstance(router.backend_for("my"), GTTSBackend)
+    # One instance per backend, so concurrency limits are shared
+    assert router.backend_for("en") is router.backend_for("en-us")
+
+
+def test_router_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        TTSRouter("festival")
@@ -0,0 +1,156 @@
+"""
+Text-to-speech backends for the PDF to Podcast Bot
+Each backend advertises how many syntheses it can run at once so the bot
+can schedule against it; backends are picked per deployment and per language
+"""
+
+import asyncio
+import logging
+import re
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTSBackend(ABC):
+    """Base class for text-to-speech engines"""
+
+    name = "base"
+    # Audio container written by synthesize(), used for the output file name
+    file_extension = ".mp3"
+    # Maximum number of concurrent synthesize() calls
+    max_concurrency = 1
+
+    def __init__(self):
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @abstractmethod
+    def synthesize(self, text: str, lang: str, output_path: Path) -> Path:
+        """Blocking synthesis of `text` into `output_path`"""
+
+    async def synthesize_async(self, text: str, lang: str, output_path: Path) -> Path:
+        """Run synthesize() in a worker thread, honouring max_concurrency"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.synthesize, text, lang, output_path)
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS (network round trip per request)"""
+
+    name = "gtts"
+    file_extension = ".mp3"
+    max_concurrency = 4
+
+    def synthesize(self, text: str, lang: str, output_path: Path) -> Path:
+        from gtts import gTTS
+
+        tts = gTTS(text=text, lang=lang, slow=False)
+        tts.save(str(output_path))
+        return output_path
+
+
+class Pyttsx3Backend(TTSBackend):
+    """Local offline synthesis via pyttsx3 (eSpeak / SAPI5 / NSSpeechSynthesizer)"""
+
+    name = "pyttsx3"
+    file_extension = ".wav"
+    # pyttsx3 drives a single native engine that is not thread-safe
+    max_concurrency = 1
+
+    def __init__(self, rate: int = 170):
+        super().__init__()
+        self.rate = rate
+
+    def synthesize(self, text: str, lang: str, output_path: Path) -> Path:
+        import pyttsx3
+
+        engine = pyttsx3.init()
+        engine.setProperty('rate', self.rate)
+
+        voice_id = self._find_voice(engine, lang)
+        if voice_id:
+            engine.setProperty('voice', voice_id)
+        else:
+            logger.warning(f"No local voice found for language '{lang}', using default voice")
+
+        engine.save_to_file(text, str(output_path))
+        engine.runAndWait()
+
+        if not output_path.exists() or output_path.stat().st_size == 0:
+            raise RuntimeError("Local TTS engine did not produce an audio file")
+
+        return output_path
+
+    @staticmethod
+    def _normalise_language(code) -> str:
+        """'en_US', 'EN-us' or eSpeak's b'\\x05en-us' -> 'en-us'"""
+        if isinstance(code, bytes):
+            code = code.decode(errors='ignore')
+        return re.sub(r'[^a-z-]', '', str(code).lower().replace('_', '-'))
+
+    @classmethod
+    def _find_voice(cls, engine, lang: str) -> Optional[str]:
+        """Voice whose language code matches `lang` exactly, else by base language"""
+        wanted = cls._normalise_language(lang)
+        base = wanted.split('-')[0]
+        fallback = None
+
+        for voice in engine.getProperty('voices'):
+            for code in (cls._normalise_language(item) for item in (voice.languages or [])):
+                if code == wanted:
+                    return voice.id
+                if fallback is None and code.split('-')[0] == base:
+                    fallback = voice.id
+
+        return fallback
+
+
+TTS_BACKENDS = {
+    GTTSBackend.name: GTTSBackend,
+    Pyttsx3Backend.name: Pyttsx3Backend,
+}
+
+
+def parse_language_backends(value: str) -> Dict[str, str]:
+    """Parse TTS_LANGUAGE_BACKENDS, e.g. "en:pyttsx3,my:gtts" """
+    mapping = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        lang, _, backend = item.partition(':')
+        if not backend.strip():
+            raise ValueError(f"Invalid TTS_LANGUAGE_BACKENDS entry: '{item}'")
+        mapping[lang.strip().lower().replace('_', '-')] = backend.strip()
+    return mapping
+
+
+class TTSRouter:
+    """Picks the backend for a language, falling back to the deployment default"""
+
+    def __init__(self, default_backend: str = "gtts", language_backends: Optional[Dict[str, str]] = None):
+        self._instances: Dict[str, TTSBackend] = {}
+        self.default_backend = default_backend
+        self.language_backends = language_backends or {}
+
+        # Fail at startup rather than on the first upload
+        for name in [default_backend] + list(self.language_backends.values()):
+            if name not in TTS_BACKENDS:
+                raise ValueError(
+                    f"Unknown TTS backend '{name}'. Available: {', '.join(TTS_BACKENDS)}"
+                )
+
+    def backend_for(self, lang: str) -> TTSBackend:
+        """Backend for `lang`, e.g. 'en-gb' uses the 'en-gb' entry, else 'en', else the default"""
+        lang = lang.lower().replace('_', '-')
+        name = self.language_backends.get(
+            lang, self.language_backends.get(lang.split('-')[0], self.default_backend)
+        )
+        if name not in self._instances:
+            self._instances[name] = TTS_BACKENDS[name]()
+        return self._instances[name]